@@ -2,13 +2,11 @@
 Content Classifier module for classifying web pages and extracting topics.
 """
 import re
-import string
-import nltk
-from nltk.corpus import stopwords
-from nltk.tokenize import word_tokenize
-from nltk.stem import WordNetLemmatizer
-from sklearn.feature_extraction.text import TfidfVectorizer
+import json
+import heapq
+import unicodedata
 from collections import Counter
+from functools import lru_cache
 import logging
 
 # Configure logging
@@ -18,18 +16,50 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# NLTK only supplies stop words and lemmatization, so the classifier still
+# works (with simpler fallbacks) when it is not installed
+try:
+    import nltk
+    from nltk.corpus import stopwords
+    from nltk.stem import WordNetLemmatizer
+except ImportError:
+    nltk = None
+    logger.warning("NLTK is not installed - using fallback stop words and no lemmatization")
+
+# Word tokens of two or more characters; punctuation never matches so no
+# separate stripping pass is needed
+_TOKEN_RE = re.compile(r"\b\w\w+\b")
+
+def _split_tokens(text):
+    """
+    Lowercase and split text into word tokens.
+    
+    NFKC normalization first folds compatibility characters (full-width letters,
+    ligatures) into their plain forms so they count as the same words; Unicode
+    punctuation such as smart quotes or dashes never matches _TOKEN_RE.
+    """
+    return _TOKEN_RE.findall(unicodedata.normalize("NFKC", text).lower())
+
+# Limits on how much page text is classified
+_MAX_CONTENT_CHARS = 10000
+_MAX_COMBINED_CHARS = 12000
+
+_nltk_data_checked = False
+
 # Download necessary NLTK resources
 def ensure_nltk_data():
-    required_packages = ['punkt', 'stopwords', 'wordnet']
+    global _nltk_data_checked
+    if nltk is None or _nltk_data_checked:
+        return
+    _nltk_data_checked = True
+    
+    required_packages = ['stopwords', 'wordnet']
     missing_packages = []
     
     # Check which packages are already downloaded
     for package in required_packages:
         try:
-            if package == 'punkt':
-                nltk.data.find('tokenizers/punkt')
-            else:
-                nltk.data.find(f'corpora/{package}')
+            nltk.data.find(f'corpora/{package}')
         except LookupError:
             missing_packages.append(package)
     
@@ -48,20 +78,37 @@ def ensure_nltk_data():
                 logger.warning(f"nltk.download('{package}')")
             logger.warning("Alternatively, you can create a fallback using simple methods for now")
 
-# Initialize NLTK resources
-ensure_nltk_data()
+_lemmatizer = WordNetLemmatizer() if nltk is not None else None
+
+@lru_cache(maxsize=200000)
+def _lemmatize(token):
+    """Lemmatize a single token, memoized since page vocabularies overlap heavily."""
+    if _lemmatizer is None:
+        return token
+    return _lemmatizer.lemmatize(token)
 
 class ContentClassifier:
     """
     Classifies web pages based on their content and extracts relevant topics.
     """
     
-    def __init__(self):
-        """Initialize the content classifier."""
+    def __init__(self, idf_path=None):
+        """
+        Initialize the content classifier.
+        
+        Args:
+            idf_path (str): Optional path to an IDF table saved with save_idf(). When
+                given, topics are ranked by TF-IDF instead of raw term frequency.
+        """
+        # NLTK data is checked (and downloaded if needed) on first use rather than
+        # at import time, to keep API cold starts fast
+        ensure_nltk_data()
+        
         # Try to use NLTK resources, fall back to basic implementation if not available
         try:
+            if nltk is None:
+                raise LookupError("NLTK is not installed")
             self.stop_words = set(stopwords.words('english'))
-            self.use_nltk = True
         except Exception:
             # Fallback to a basic set of stop words if NLTK data is not available
             logger.warning("Using fallback stop words list")
@@ -71,13 +118,6 @@ class ContentClassifier:
                 'such', 'both', 'through', 'about', 'for', 'is', 'of', 'while', 'during',
                 'to', 'from', 'in', 'on', 'by', 'with', 'at', 'into'
             }
-            self.use_nltk = False
-            
-        try:
-            self.lemmatizer = WordNetLemmatizer()
-        except Exception:
-            # We'll just use the words as-is if lemmatization is not available
-            self.lemmatizer = None
             
         # Pre-defined categories with associated keywords
         self.categories = {
@@ -89,47 +129,80 @@ class ContentClassifier:
             'technology': ['tech', 'technology', 'software', 'hardware', 'digital', 'app', 'application', 'device', 'platform', 'system']
         }
         
+        # Reverse index so a page's tokens can be matched against every
+        # category with a single set intersection
+        self._keyword_categories = {}
+        for category, keywords in self.categories.items():
+            for keyword in keywords:
+                self._keyword_categories.setdefault(keyword, []).append(category)
+        self._all_keywords = frozenset(self._keyword_categories)
+        
+        # Corpus-level inverse document frequencies used to rank topics
+        self.idf = None
+        self._default_idf = None
+        if idf_path:
+            self.load_idf(idf_path)
+    
+    def fit_idf(self, texts):
+        """
+        Learn inverse document frequencies from a sample of page texts.
+        
+        Args:
+            texts (list): Raw page texts, e.g. title + description + body of crawled pages
+            
+        Returns:
+            ContentClassifier: self, to allow chaining
+        """
+        # Imported lazily; scikit-learn is only needed when fitting
+        from sklearn.feature_extraction.text import TfidfVectorizer
+        
+        vectorizer = TfidfVectorizer(tokenizer=self._tokenize, lowercase=False, token_pattern=None)
+        vectorizer.fit(texts)
+        
+        self.idf = dict(zip(vectorizer.get_feature_names_out(), vectorizer.idf_.tolist()))
+        # Terms never seen while fitting are treated as the rarest ones
+        self._default_idf = float(vectorizer.idf_.max())
+        return self
+    
+    def save_idf(self, path):
+        """Persist the fitted IDF table as JSON."""
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({"idf": self.idf, "default_idf": self._default_idf}, f)
+    
+    def load_idf(self, path):
+        """Load an IDF table previously written by save_idf()."""
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+        self.idf = data["idf"]
+        self._default_idf = data["default_idf"]
+        
     def preprocess_text(self, text):
         """Preprocess the text for analysis."""
+        return " ".join(self._tokenize(text))
+    
+    def _tokenize(self, text):
+        """Lowercase, tokenize, drop stopwords and lemmatize the text into a token list."""
         if not text:
-            return ""
+            return []
             
-        # Convert to lowercase
-        text = text.lower()
-        
-        # Remove punctuation
-        text = text.translate(str.maketrans('', '', string.punctuation))
-        
-        # Tokenize
-        if self.use_nltk:
-            try:
-                tokens = word_tokenize(text)
-            except Exception:
-                # Fallback tokenization - simple split by whitespace
-                tokens = text.split()
-        else:
-            tokens = text.split()
+        # Normalize, convert to lowercase and tokenize
+        tokens = _split_tokens(text)
         
         # Remove stopwords and lemmatize
-        if self.lemmatizer:
-            try:
-                filtered_tokens = [
-                    self.lemmatizer.lemmatize(token) 
-                    for token in tokens 
-                    if token not in self.stop_words and len(token) > 1
-                ]
-            except Exception:
-                filtered_tokens = [
-                    token for token in tokens 
-                    if token not in self.stop_words and len(token) > 1
-                ]
-        else:
+        try:
             filtered_tokens = [
-                token for token in tokens 
-                if token not in self.stop_words and len(token) > 1
+                _lemmatize(token)
+                for token in tokens
+                if token not in self.stop_words
+            ]
+        except Exception:
+            # We'll just use the words as-is if lemmatization is not available
+            filtered_tokens = [
+                token for token in tokens
+                if token not in self.stop_words
             ]
         
-        return " ".join(filtered_tokens)
+        return filtered_tokens
     
     def classify_page(self, metadata):
         """
@@ -142,55 +215,71 @@ class ContentClassifier:
             dict: Classification results and extracted topics
         """
         try:
-            # Combine title, description, and content
-            combined_text = ""
-            if metadata.get('title'):
-                combined_text += f"{metadata['title']} "
-                
-            if metadata.get('description'):
-                combined_text += f"{metadata['description']} "
-                
-            if metadata.get('text_content'):
-                # Use a portion of the text content if it's very long
-                text_content = metadata['text_content']
-                if len(text_content) > 10000:  # Limit to 10,000 characters
-                    text_content = text_content[:10000]
-                combined_text += text_content
+            combined_text = self._combine_text(metadata)
             
             if not combined_text:
-                return {
-                    "page_type": "unknown",
-                    "categories": [],
-                    "topics": [],
-                    "error": "Insufficient content for classification"
-                }
+                return self._empty_result()
             
             # Preprocess the text
-            processed_text = self.preprocess_text(combined_text)
-            
-            # Determine page type based on URL, structure and metadata
-            page_type = self._determine_page_type(metadata)
-            
-            # Determine categories
-            categories = self._classify_categories(processed_text)
-            
-            # Extract topics
-            topics = self._extract_topics(processed_text)
+            tokens = self._tokenize(combined_text)
             
-            return {
-                "page_type": page_type,
-                "categories": categories,
-                "topics": topics
-            }
+            return self._classify_tokens(metadata, tokens)
             
         except Exception as e:
             logger.error(f"Error classifying content: {e}")
-            return {
-                "error": str(e),
-                "page_type": "unknown",
-                "categories": [],
-                "topics": []
-            }
+            return self._error_result(e)
+    
+    def _combine_text(self, metadata):
+        """Combine title, description, and content into one bounded text to classify."""
+        parts = []
+        if metadata.get('title'):
+            parts.append(metadata['title'])
+            
+        if metadata.get('description'):
+            parts.append(metadata['description'])
+            
+        if metadata.get('text_content'):
+            # Use a portion of the text content if it's very long
+            parts.append(metadata['text_content'][:_MAX_CONTENT_CHARS])
+        
+        # Cap the total as well, so an oversized title or description cannot
+        # make normalization and tokenization scan more than needed
+        return " ".join(parts)[:_MAX_COMBINED_CHARS]
+    
+    def _classify_tokens(self, metadata, tokens):
+        """Build the classification result from the page's preprocessed tokens."""
+        # Determine page type based on URL, structure and metadata
+        page_type = self._determine_page_type(metadata)
+        
+        # Determine categories
+        categories = self._classify_categories(tokens)
+        
+        # Extract topics
+        topics = self._extract_topics(tokens)
+        
+        return {
+            "page_type": page_type,
+            "categories": categories,
+            "topics": topics
+        }
+    
+    def _empty_result(self):
+        """Result returned when a page has no text to classify."""
+        return {
+            "page_type": "unknown",
+            "categories": [],
+            "topics": [],
+            "error": "Insufficient content for classification"
+        }
+    
+    def _error_result(self, error):
+        """Result returned when classification fails."""
+        return {
+            "error": str(error),
+            "page_type": "unknown",
+            "categories": [],
+            "topics": []
+        }
     
     def _determine_page_type(self, metadata):
         """Determine the page type based on URL and structure."""
@@ -225,14 +314,18 @@ class ContentClassifier:
         # Default to generic page
         return 'generic'
     
-    def _classify_categories(self, processed_text):
+    def _classify_categories(self, tokens):
         """Classify the content into predefined categories."""
-        token_set = set(processed_text.split())
-        categories = []
+        hits = self._all_keywords.intersection(tokens)
         
+        # Count how many keywords for each category appear in the text
+        match_counts = Counter(
+            category for keyword in hits for category in self._keyword_categories[keyword]
+        )
+        
+        categories = []
         for category, keywords in self.categories.items():
-            # Count how many keywords for this category appear in the text
-            matches = sum(1 for keyword in keywords if keyword in token_set)
+            matches = match_counts[category]
             if matches >= 2:  # Require at least 2 keyword matches
                 categories.append({
                     "name": category,
@@ -244,24 +337,27 @@ class ContentClassifier:
         
         return categories
     
-    def _extract_topics(self, processed_text):
-        """Extract main topics from the processed text."""
-        if not processed_text:
+    def _extract_topics(self, tokens):
+        """Extract main topics from the preprocessed tokens."""
+        if not tokens:
             return []
             
-        # Simple keyword extraction using word frequency
-        words = processed_text.split()
-        
-        # Count word frequencies
-        word_counts = Counter(words)
-        
-        # Get the top 10 most common words with length > 3
-        topics = [word for word, count in word_counts.most_common(20) if len(word) > 3]
+        # Simple keyword extraction using word frequency, counting only
+        # words with length > 3 so short noise never enters the counter
+        word_counts = Counter(word for word in tokens if len(word) > 3)
         
-        # Keep only the top 10 topics
-        topics = topics[:10]
+        # Rank by TF-IDF when a corpus IDF table is available
+        if self.idf:
+            idf = self.idf
+            default_idf = self._default_idf
+            return heapq.nlargest(
+                10,
+                word_counts,
+                key=lambda word: word_counts[word] * idf.get(word, default_idf)
+            )
         
-        return topics
+        # Get the top 10 most common words
+        return [word for word, count in word_counts.most_common(10)]
 
 # For testing
 if __name__ == "__main__":
@@ -3,10 +3,31 @@ Metadata Extractor module for extracting useful metadata from web pages.
 """
 import re
 from bs4 import BeautifulSoup
+import soupsieve
 import logging
 from urllib.parse import urlparse
 import json
 
+try:
+    # orjson is a much faster JSON parser; its JSONDecodeError subclasses json's
+    from orjson import loads as json_loads
+except ImportError:
+    from json import loads as json_loads
+
+try:
+    # lxml's C parser builds the BeautifulSoup tree several times faster than
+    # the pure-Python html.parser, which is only used when lxml is missing
+    import lxml  # noqa: F401
+    _BS4_PARSER = 'lxml'
+except ImportError:
+    _BS4_PARSER = 'html.parser'
+
+try:
+    from selectolax.lexbor import LexborHTMLParser
+except ImportError:
+    # selectolax is optional; main content is extracted with BeautifulSoup without it
+    LexborHTMLParser = None
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -14,6 +35,24 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Runs of whitespace collapsed to a single space in extracted body text
+_WS_RE = re.compile(r'\s+')
+
+# Elements whose text is taken as the main content, in order of preference
+_MAIN_CONTENT_SELECTORS = ['main', 'article', 'section', '[role=main]']
+
+# Page furniture dropped from the body text when no main content element exists
+_BOILERPLATE_SELECTOR = 'nav, header, footer, aside, style, script, [role=banner], [role=navigation], [role=complementary]'
+
+# The same selectors compiled once for the BeautifulSoup fallback, instead of
+# being parsed from strings on every page
+_MAIN_CONTENT_PATTERNS = [soupsieve.compile(selector) for selector in _MAIN_CONTENT_SELECTORS]
+_BOILERPLATE_PATTERN = soupsieve.compile(_BOILERPLATE_SELECTOR)
+
+# Every element the extractor reads, gathered in a single walk over the tree
+_HEADING_TAGS = ('h1', 'h2', 'h3', 'h4', 'h5', 'h6')
+_SCANNED_TAGS = ('html', 'title', 'meta', 'link', 'a', 'img', 'script') + _HEADING_TAGS
+
 class MetadataExtractor:
     """
     Extracts metadata from HTML content including title, description, body text,
@@ -29,32 +68,40 @@ class MetadataExtractor:
         Extract metadata from HTML content.
         
         Args:
-            html_content (str): The raw HTML content
+            html_content (str or bytes): The raw HTML content; bytes are handed to the
+                parsers undecoded, with the encoding taken from the document
             url (str): The URL of the page
             
         Returns:
             dict: Extracted metadata
         """
         try:
-            soup = BeautifulSoup(html_content, 'html.parser')
+            soup = BeautifulSoup(html_content, _BS4_PARSER)
+            elements = self._collect_elements(soup)
+            
+            title, description, canonical_url, language, meta_tags = self._extract_head_fields(elements, url)
             
             # Extract basic metadata
             metadata = {
                 "url": url,
                 "domain": urlparse(url).netloc,
-                "title": self._extract_title(soup),
-                "description": self._extract_description(soup),
-                "canonical_url": self._extract_canonical(soup, url),
-                "language": self._extract_language(soup),
-                "headings": self._extract_headings(soup),
-                "text_content": self._extract_main_content(soup),
+                "title": title,
+                "description": description,
+                "canonical_url": canonical_url,
+                "language": language,
+                "headings": self._extract_headings(elements),
+                "text_content": None,  # Will be extracted last
                 "word_count": 0,  # Will be calculated
-                "links": self._extract_links(soup, url),
-                "images": self._extract_images(soup, url),
-                "structured_data": self._extract_structured_data(soup),
-                "meta_tags": self._extract_meta_tags(soup),
+                "links": self._extract_links(elements, url),
+                "images": self._extract_images(elements, url),
+                "structured_data": self._extract_structured_data(elements),
+                "meta_tags": meta_tags,
             }
             
+            # The BeautifulSoup fallback strips navigation and scripts from the
+            # tree, so it has to run after everything else has been extracted
+            metadata["text_content"] = self._extract_main_content(soup, html_content)
+            
             # Calculate word count
             if metadata["text_content"]:
                 metadata["word_count"] = len(metadata["text_content"].split())
@@ -68,127 +115,158 @@ class MetadataExtractor:
                 "url": url
             }
     
-    def _extract_title(self, soup):
-        """Extract the page title."""
-        title_tag = soup.find('title')
-        return title_tag.get_text().strip() if title_tag else None
+    def _collect_elements(self, soup):
+        """
+        Walk the parsed tree once, bucketing the elements the extractor reads by tag name.
+        
+        Returns:
+            dict: Tag name -> list of elements, in document order
+        """
+        elements = {name: [] for name in _SCANNED_TAGS}
+        for el in soup.find_all(_SCANNED_TAGS):
+            elements[el.name].append(el)
+        return elements
     
-    def _extract_description(self, soup):
-        """Extract the meta description."""
-        meta_desc = soup.find('meta', attrs={'name': 'description'})
+    def _extract_head_fields(self, elements, default_url):
+        """
+        Extract the title, meta description, canonical URL, language and meta tags
+        from the collected title, meta and link elements.
+        
+        Returns:
+            tuple: (title, description, canonical_url, language, meta_tags)
+        """
+        meta_desc = None
+        canonical = None
+        meta_lang = None
+        meta_tags = {}
+        
+        for el in elements['meta']:
+            if meta_desc is None and el.get('name') == 'description':
+                meta_desc = el
+            if meta_lang is None and el.get('http-equiv') == 'content-language':
+                meta_lang = el
+            if el.has_attr('content'):
+                if el.has_attr('name'):
+                    meta_tags[el['name']] = el['content']
+                elif el.has_attr('property'):
+                    meta_tags[el['property']] = el['content']
+        
+        for el in elements['link']:
+            if 'canonical' in el.get('rel', []):
+                canonical = el
+                break
+        
+        title_tags = elements['title']
+        title = title_tags[0].get_text().strip() if title_tags else None
+        
+        description = None
         if meta_desc and meta_desc.has_attr('content'):
-            return meta_desc['content'].strip()
-        return None
-    
-    def _extract_canonical(self, soup, default_url):
-        """Extract the canonical URL."""
-        canonical = soup.find('link', attrs={'rel': 'canonical'})
+            description = meta_desc['content'].strip()
+        
+        canonical_url = default_url
         if canonical and canonical.has_attr('href'):
-            return canonical['href']
-        return default_url
-    
-    def _extract_language(self, soup):
-        """Extract the page language."""
-        # Check html tag
-        html_tag = soup.find('html')
+            canonical_url = canonical['href']
+        
+        # Check html tag first, then meta tags
+        language = None
+        html_tag = elements['html'][0] if elements['html'] else None
         if html_tag and html_tag.has_attr('lang'):
-            return html_tag['lang']
+            language = html_tag['lang']
+        elif meta_lang and meta_lang.has_attr('content'):
+            language = meta_lang['content']
         
-        # Check meta tags
-        meta_lang = soup.find('meta', attrs={'http-equiv': 'content-language'})
-        if meta_lang and meta_lang.has_attr('content'):
-            return meta_lang['content']
-            
-        return None
+        return title, description, canonical_url, language, meta_tags
     
-    def _extract_headings(self, soup):
+    def _extract_headings(self, elements):
         """Extract all headings (h1-h6) from the page."""
-        headings = {}
-        
-        for level in range(1, 7):
-            tag = f'h{level}'
-            heading_tags = soup.find_all(tag)
-            headings[tag] = [heading.get_text().strip() for heading in heading_tags]
-            
-        return headings
+        return {
+            level: [heading.get_text().strip() for heading in elements[level]]
+            for level in _HEADING_TAGS
+        }
     
-    def _extract_main_content(self, soup):
+    def _extract_main_content(self, soup, html_content):
         """Extract the main textual content from the page."""
+        if LexborHTMLParser is not None:
+            return self._extract_main_content_lexbor(html_content)
+        
         # Try to find content in main content tags
-        for tag in ['main', 'article', 'section', '[role=main]']:
-            content = soup.select(tag)
+        for pattern in _MAIN_CONTENT_PATTERNS:
+            content = pattern.select(soup)
             if content:
                 return ' '.join([el.get_text().strip() for el in content])
         
         # If no main content found, extract from body but remove navigation, header, footer, etc.
-        for el in soup.select('nav, header, footer, aside, style, script, [role=banner], [role=navigation], [role=complementary]'):
+        for el in _BOILERPLATE_PATTERN.select(soup):
             el.extract()
             
         body = soup.find('body')
         if body:
             # Remove extra whitespace
-            text = re.sub(r'\s+', ' ', body.get_text().strip())
+            text = _WS_RE.sub(' ', body.get_text().strip())
             return text
             
         return None
     
-    def _extract_links(self, soup, base_url):
+    def _extract_main_content_lexbor(self, html_content):
+        """Extract the main textual content using selectolax's C-based Lexbor parser."""
+        tree = LexborHTMLParser(html_content)
+        
+        # BeautifulSoup's get_text() skips script and style contents; match that
+        tree.strip_tags(['script', 'style', 'template'])
+        
+        # Try to find content in main content tags
+        for tag in _MAIN_CONTENT_SELECTORS:
+            content = tree.css(tag)
+            if content:
+                return ' '.join([node.text().strip() for node in content])
+        
+        # If no main content found, extract from body but remove navigation, header, footer, etc.
+        for node in tree.css(_BOILERPLATE_SELECTOR):
+            node.decompose()
+        
+        if tree.body:
+            # Remove extra whitespace
+            return _WS_RE.sub(' ', tree.body.text().strip())
+        
+        return None
+    
+    def _extract_links(self, elements, base_url):
         """Extract all links from the page."""
+        base_netloc = urlparse(base_url).netloc
         links = []
-        for link in soup.find_all('a'):
-            if link.has_attr('href'):
-                href = link['href']
-                text = link.get_text().strip()
-                links.append({
-                    'href': href,
-                    'text': text,
-                    'is_internal': not href.startswith('http') or urlparse(base_url).netloc in href
-                })
+        for link in elements['a']:
+            href = link.attrs.get('href')
+            if href is None:
+                continue
+            links.append({
+                'href': href,
+                'text': link.get_text().strip(),
+                'is_internal': not href.startswith('http') or base_netloc in href
+            })
         return links
     
-    def _extract_images(self, soup, base_url):
+    def _extract_images(self, elements, base_url):
         """Extract all images from the page."""
-        images = []
-        for img in soup.find_all('img'):
-            image_data = {}
-            
-            if img.has_attr('src'):
-                image_data['src'] = img['src']
-                
-            if img.has_attr('alt'):
-                image_data['alt'] = img['alt']
-                
-            if img.has_attr('title'):
-                image_data['title'] = img['title']
-                
-            images.append(image_data)
-            
-        return images
+        return [
+            {key: img.attrs[key] for key in ('src', 'alt', 'title') if key in img.attrs}
+            for img in elements['img']
+        ]
     
-    def _extract_structured_data(self, soup):
+    def _extract_structured_data(self, elements):
         """Extract structured data (JSON-LD) from the page."""
         structured_data = []
         
-        for script in soup.find_all('script', type='application/ld+json'):
+        for script in elements['script']:
+            if script.get('type') != 'application/ld+json' or script.string is None:
+                continue
             try:
-                data = json.loads(script.string)
+                # orjson only accepts exact str, not BeautifulSoup's str subclasses
+                data = json_loads(str(script.string))
                 structured_data.append(data)
             except (json.JSONDecodeError, TypeError):
                 pass
                 
         return structured_data
-    
-    def _extract_meta_tags(self, soup):
-        """Extract all meta tags from the page."""
-        meta_tags = {}
-        
-        for meta in soup.find_all('meta'):
-            if meta.has_attr('name') and meta.has_attr('content'):
-                meta_tags[meta['name']] = meta['content']
-            elif meta.has_attr('property') and meta.has_attr('content'):
-                meta_tags[meta['property']] = meta['content']
-                
-        return meta_tags
 
 # For testing
 if __name__ == "__main__":
@@ -2,15 +2,19 @@
 FastAPI application for exposing the web crawler and analyzer as a service.
 """
 import os
+import json
 import time
-import random
-from fastapi import FastAPI, HTTPException, Query, BackgroundTasks
+import uuid
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Query
 from fastapi.responses import JSONResponse
 from pydantic import BaseModel, HttpUrl
 import uvicorn
 import logging
 import asyncio
 from typing import Optional, List, Dict, Any
+from urllib.parse import urlsplit, urlunsplit
+from cachetools import TTLCache
 
 # Import the crawler and analyzer components
 import sys
@@ -46,18 +50,38 @@ metadata_extractor = MetadataExtractor()
 # Initialize the content classifier if available
 if classifier_available:
     try:
-        content_classifier = ContentClassifier()
+        content_classifier = ContentClassifier(idf_path=os.getenv("CLASSIFIER_IDF_PATH"))
     except Exception as e:
         logger.warning(f"Failed to initialize ContentClassifier: {e}")
         classifier_available = False
 else:
     logger.warning("ContentClassifier is not available - classification features will be disabled")
 
+# Crawl jobs wait in a bounded queue and are consumed by a fixed pool of
+# worker tasks, so bursts of requests cannot exceed the crawl concurrency
+CRAWL_WORKERS = int(os.getenv("CRAWL_WORKERS", "4"))
+CRAWL_QUEUE_SIZE = int(os.getenv("CRAWL_QUEUE_SIZE", "1000"))
+crawl_queue: Optional[asyncio.Queue] = None
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start the crawl worker pool on startup and stop it on shutdown."""
+    global crawl_queue
+    crawl_queue = asyncio.Queue(maxsize=CRAWL_QUEUE_SIZE)
+    workers = [asyncio.create_task(crawl_worker()) for _ in range(CRAWL_WORKERS)]
+    try:
+        yield
+    finally:
+        for worker in workers:
+            worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+
 # Create the FastAPI app
 app = FastAPI(
     title="Web Crawler and Analyzer API",
     description="API for crawling websites, extracting metadata, and classifying content",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
 # Define request and response models
@@ -71,8 +95,49 @@ class CrawlResponse(BaseModel):
     result: Optional[Dict[str, Any]] = None
     error: Optional[str] = None
 
-# In-memory cache for results (in a real implementation, use Redis or similar)
-results_cache = {}
+# Results are stored in Redis when REDIS_URL is set, so every worker process
+# sees the same jobs and entries expire after RESULT_TTL seconds
+RESULT_TTL = int(os.getenv("RESULT_TTL", "3600"))
+redis_client = None
+if os.getenv("REDIS_URL"):
+    try:
+        import redis.asyncio as redis
+        redis_client = redis.from_url(os.getenv("REDIS_URL"))
+    except ImportError:
+        logger.warning("redis package is not installed - using the in-memory results cache")
+
+# In-memory fallback for results when Redis is not configured; bounded, and
+# expiring after RESULT_TTL seconds like the Redis entries
+results_cache = TTLCache(
+    maxsize=int(os.getenv("RESULTS_CACHE_SIZE", "10000")),
+    ttl=RESULT_TTL
+)
+
+# Completed results keyed by (normalized URL, respect_robots), so repeated
+# requests for the same page skip crawling, parsing and classification
+url_cache = TTLCache(
+    maxsize=int(os.getenv("URL_CACHE_SIZE", "10000")),
+    ttl=int(os.getenv("URL_CACHE_TTL", "3600"))
+)
+
+def normalize_url(url: str) -> str:
+    """Normalize a URL for cache lookups: lowercase scheme and host, drop the fragment."""
+    parts = urlsplit(url)
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path or "/", parts.query, ""))
+
+async def save_result(request_id: str, result: Dict[str, Any]):
+    """Store the state of a crawl request."""
+    if redis_client is not None:
+        await redis_client.set(request_id, json.dumps(result), ex=RESULT_TTL)
+    else:
+        results_cache[request_id] = result
+
+async def load_result(request_id: str) -> Optional[Dict[str, Any]]:
+    """Fetch the state of a crawl request, or None if it is unknown or expired."""
+    if redis_client is not None:
+        raw = await redis_client.get(request_id)
+        return json.loads(raw) if raw is not None else None
+    return results_cache.get(request_id)
 
 @app.get("/")
 async def root():
@@ -80,26 +145,32 @@ async def root():
     return {"status": "OK", "message": "Web Crawler API is running"}
 
 @app.post("/crawl", response_model=CrawlResponse)
-async def crawl_url(crawl_request: CrawlRequest, background_tasks: BackgroundTasks):
+async def crawl_url(crawl_request: CrawlRequest):
     """
     Crawl a URL, extract metadata, and classify content.
     """
+    # The queue and its workers only exist once the app's lifespan has run
+    if crawl_queue is None:
+        raise HTTPException(status_code=503, detail="Crawl workers are not running")
+    
     # Generate a request ID
-    request_id = f"req_{int(time.time())}_{hash(crawl_request.url)}"
+    request_id = f"req_{uuid.uuid4().hex}"
     
     # Store initial state in cache
-    results_cache[request_id] = {
+    await save_result(request_id, {
         "status": "processing",
         "url": str(crawl_request.url)
-    }
+    })
     
-    # Run the crawl in the background
-    background_tasks.add_task(
-        process_url,
-        request_id,
-        str(crawl_request.url),
-        crawl_request.respect_robots
-    )
+    # Hand the job to the crawl workers
+    try:
+        crawl_queue.put_nowait((request_id, str(crawl_request.url), crawl_request.respect_robots))
+    except asyncio.QueueFull:
+        await save_result(request_id, {
+            "status": "failed",
+            "error": "Crawl queue is full"
+        })
+        raise HTTPException(status_code=503, detail="Crawl queue is full, try again later")
     
     # Return the request ID immediately
     return CrawlResponse(
@@ -112,11 +183,10 @@ async def get_result(request_id: str):
     """
     Get the result of a previously submitted crawl request.
     """
-    if request_id not in results_cache:
+    result = await load_result(request_id)
+    if result is None:
         raise HTTPException(status_code=404, detail="Request ID not found")
     
-    result = results_cache[request_id]
-    
     # Check if processing is complete
     if result["status"] == "processing":
         return CrawlResponse(
@@ -136,59 +206,56 @@ async def get_result(request_id: str):
             result=result.get("data")
         )
 
+async def crawl_worker():
+    """Consume crawl jobs from the queue until cancelled."""
+    while True:
+        request_id, url, respect_robots = await crawl_queue.get()
+        try:
+            await process_url(request_id, url, respect_robots)
+        except Exception as e:
+            logger.error(f"Crawl worker failed on {url}: {e}")
+        finally:
+            crawl_queue.task_done()
+
 async def process_url(request_id: str, url: str, respect_robots: bool):
     """
     Process a URL by crawling, extracting metadata, and classifying content.
-    This function runs as a background task.
+    This function is run by the crawl workers.
     """
+    cache_key = (normalize_url(url), respect_robots)
+    cached = url_cache.get(cache_key)
+    if cached is not None:
+        logger.info(f"Serving cached result for {url}")
+        await save_result(request_id, {
+            "status": "completed",
+            "data": cached
+        })
+        return
+    
     try:
-        # Set crawler respect_robots setting
-        crawler.respect_robots = respect_robots
-        
-        # Make up to 3 attempts to crawl the URL with increasing delays
-        max_attempts = 3
-        attempt = 0
-        crawl_result = None
+        # Run the synchronous crawler.crawl in a thread to avoid blocking; it
+        # already retries transient HTTP failures itself. respect_robots is
+        # passed per call, since the crawler is shared by concurrent jobs
+        crawl_result = await asyncio.to_thread(crawler.crawl, url, respect_robots)
         
-        while attempt < max_attempts:
-            try:
-                # Crawl the URL with exponential backoff
-                # Run the synchronous crawler.crawl in a thread to avoid blocking
-                crawl_result = await asyncio.to_thread(crawler.crawl, url)
-                
-                # If successful or got a non-retriable error, break the loop
-                if "error" not in crawl_result or "HTTP error: 403" in crawl_result.get("error", ""):
-                    break
-                    
-                # If we got a 500, 502, 503 or similar error, retry
-                attempt += 1
-                if attempt < max_attempts:
-                    # Exponential backoff with jitter
-                    delay = (2 ** attempt) + random.uniform(1, 3)
-                    time.sleep(delay)
-            except Exception as e:
-                logger.error(f"Error on attempt {attempt + 1}/{max_attempts} crawling {url}: {e}")
-                attempt += 1
-                if attempt < max_attempts:
-                    time.sleep(2 ** attempt)
-        
-        # Check final result            
-        if crawl_result is None or "error" in crawl_result:
-            error_msg = crawl_result.get("error", "Unknown error") if crawl_result else "Maximum retry attempts reached"
-            results_cache[request_id] = {
+        # Check final result
+        if "error" in crawl_result:
+            await save_result(request_id, {
                 "status": "failed",
-                "error": error_msg
-            }
+                "error": crawl_result["error"]
+            })
             return
         
-        # Extract metadata
-        metadata = metadata_extractor.extract_metadata(crawl_result["html_content"], url)
+        # Extract metadata (CPU-bound, so keep it off the event loop)
+        metadata = await asyncio.to_thread(
+            metadata_extractor.extract_metadata, crawl_result["html_content"], url
+        )
         
         # Classify content if the classifier is available
         classification = None
         if classifier_available:
             try:
-                classification = content_classifier.classify_page(metadata)
+                classification = await asyncio.to_thread(content_classifier.classify_page, metadata)
             except Exception as e:
                 logger.warning(f"Error classifying content: {e}")
                 classification = {
@@ -218,17 +285,18 @@ async def process_url(request_id: str, url: str, respect_robots: bool):
             del crawl_result["html_content"]
             
         # Store the result
-        results_cache[request_id] = {
+        url_cache[cache_key] = result
+        await save_result(request_id, {
             "status": "completed",
             "data": result
-        }
+        })
         
     except Exception as e:
         logger.error(f"Error processing URL {url}: {e}")
-        results_cache[request_id] = {
+        await save_result(request_id, {
             "status": "failed",
             "error": str(e)
-        }
+        })
 
 @app.get("/health")
 async def health_check():
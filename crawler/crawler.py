@@ -2,18 +2,29 @@
 Web Crawler module for extracting web page content.
 """
 import requests
-from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import aiohttp
+from aiohttp.resolver import AsyncResolver
 import logging
-from urllib.parse import urlparse, urljoin
-import re
+from urllib.parse import urlparse
 import time
 import random
-from pathlib import Path
 import os
 import robotexclusionrulesparser
 import asyncio
-import importlib
-from functools import wraps
+import codecs
+import importlib.util
+import threading
+from cachetools import LRUCache
+
+try:
+    # uvloop is optional; its libuv-based event loop cuts per-socket overhead for
+    # the async crawl path. Without it the standard asyncio loop is used
+    import uvloop
+    asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+except ImportError:
+    pass
 
 # Configure logging
 logging.basicConfig(
@@ -22,13 +33,86 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# URLs longer than this are almost always session IDs or crawler traps
+MAX_URL_LENGTH = 2048
+
+# Domains whose last access time, robots.txt rules and request semaphore are
+# remembered; the least recently used are forgotten first, so a long crawl
+# doesn't grow without bound
+MAX_TRACKED_DOMAINS = 100000
+
+# Media type a response must declare to be processed; compared against the
+# lowercased Content-Type header, which may carry parameters such as charset
+HTML_CONTENT_TYPE = 'text/html'
+
+# File extensions that never point at an HTML page
+NON_HTML_EXTENSIONS = frozenset([
+    '.jpg', '.jpeg', '.png', '.gif', '.webp', '.svg', '.ico', '.bmp', '.tif', '.tiff',
+    '.pdf', '.doc', '.docx', '.xls', '.xlsx', '.ppt', '.pptx',
+    '.zip', '.gz', '.tgz', '.tar', '.rar', '.7z', '.exe', '.dmg', '.iso', '.apk',
+    '.mp3', '.mp4', '.avi', '.mov', '.wmv', '.webm', '.ogg', '.wav', '.flac',
+    '.css', '.js', '.json', '.xml', '.rss', '.woff', '.woff2', '.ttf', '.eot',
+])
+
+# Pages with more HTML than this (in characters) are never kept for revalidation;
+# each would push many smaller pages out of the HTTP cache
+MAX_CACHED_PAGE_SIZE = 1024 * 1024
+
+def _cached_page_size(entry):
+    """Size of an HTTP cache entry, (etag, last_modified, result), by its HTML length."""
+    return len(entry[2].get('html_content', '')) or 1
+
+# Response headers copied into crawl results; the rest are dropped
+RESULT_HEADERS = ('Content-Type', 'Content-Length', 'ETag', 'Last-Modified', 'Cache-Control', 'Retry-After')
+
+def _select_headers(headers):
+    """Copy the RESULT_HEADERS present in a case-insensitive header mapping into a dict."""
+    return {name: headers[name] for name in RESULT_HEADERS if name in headers}
+
+def _decode_body(body, content_type):
+    """
+    Decode a response body with the charset declared in its Content-Type header.
+    
+    Both crawl paths decode the same way: UTF-8 when no charset is declared or the
+    declared one isn't a known codec, and undecodable bytes are replaced.
+    """
+    charset = 'utf-8'
+    for param in content_type.split(';')[1:]:
+        name, _, value = param.partition('=')
+        if name.strip().lower() == 'charset':
+            value = value.strip().strip('"\'')
+            try:
+                charset = codecs.lookup(value).name
+            except LookupError:
+                logger.warning(f"Unknown charset {value!r}, decoding as UTF-8")
+            break
+    return body.decode(charset, errors='replace')
+
+# Resource types the Playwright fallback never downloads; only the DOM is needed
+BLOCKED_RESOURCE_TYPES = frozenset(['image', 'media', 'font', 'stylesheet'])
+
+async def _block_heavy_resources(route):
+    """Playwright route handler aborting requests for resources that don't affect the HTML."""
+    if route.request.resource_type in BLOCKED_RESOURCE_TYPES:
+        await route.abort()
+    else:
+        await route.continue_()
+
 class WebCrawler:
     """
     A web crawler that respects robots.txt and extracts page content.
     Has fallback methods using browser automation for sites with anti-crawler measures.
     """
     
-    def __init__(self, delay=1.0, user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/98.0.4758.102 Safari/537.36", respect_robots=True, browser_emulation=True, use_fallback=True):
+    # Looked up once per process; find_spec locates the package without importing it
+    _PLAYWRIGHT_AVAILABLE = importlib.util.find_spec('playwright') is not None
+    
+    # Parsed robots.txt rules by domain, shared by every crawler in the process;
+    # the rules depend only on the site, so a new crawler doesn't refetch them
+    _robots_cache = LRUCache(maxsize=MAX_TRACKED_DOMAINS)
+    _robots_lock = threading.Lock()
+    
+    def __init__(self, delay=1.0, user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/98.0.4758.102 Safari/537.36", respect_robots=True, browser_emulation=True, use_fallback=True, max_concurrency=64, per_host_limit=8, robots_ttl=3600, max_bytes=5 * 1024 * 1024, http_cache_bytes=16 * 1024 * 1024, jitter=None):
         """
         Initialize the crawler with configurable parameters.
         
@@ -36,34 +120,73 @@ class WebCrawler:
             delay (float): Delay between requests to the same domain in seconds
             user_agent (str): User agent string to identify the crawler
             respect_robots (bool): Whether to respect robots.txt rules
+            max_concurrency (int): Maximum number of requests in flight at once (async crawling)
+            per_host_limit (int): Maximum number of requests in flight per host (async crawling)
+            robots_ttl (float): Seconds a domain's parsed robots.txt is reused before refetching
+            max_bytes (int): Maximum number of body bytes read per page; pages declaring a
+                larger Content-Length are skipped, others are truncated
+            http_cache_bytes (int): Total HTML size, in characters, of the pages kept for
+                ETag/Last-Modified revalidation
+            jitter (bool): Randomize the delay between requests to a domain; defaults to browser_emulation
         """
         self.delay = delay
         self.user_agent = user_agent
         self.respect_robots = respect_robots
         self.browser_emulation = browser_emulation
         self.use_fallback = use_fallback
-        self.domain_last_accessed = {}
-        self.robots_parser = robotexclusionrulesparser.RobotExclusionRulesParser()
-        self.robots_cache = {}
-        self._playwright_available = self._check_module_available('playwright')
+        # Time of the latest (or next scheduled) request to each domain. The sync
+        # path may run in worker threads and cachetools caches aren't thread-safe
+        self.domain_last_accessed = LRUCache(maxsize=MAX_TRACKED_DOMAINS)
+        self._domain_lock = threading.Lock()
+        self.robots_cache = WebCrawler._robots_cache
+        self.robots_ttl = robots_ttl
+        self.max_concurrency = max_concurrency
+        self.per_host_limit = per_host_limit
+        self.max_bytes = max_bytes
+        self.jitter = browser_emulation if jitter is None else jitter
+        
+        # Recently crawled pages with their validators, so a repeat fetch can be a
+        # conditional request answered by a body-less 304. Shared by both crawl
+        # paths, and the sync path may run in worker threads, hence the lock
+        self.http_cache = LRUCache(maxsize=http_cache_bytes, getsizeof=_cached_page_size)
+        self._http_cache_lock = threading.Lock()
+        
+        # State for async crawling; asyncio primitives belong to one event loop,
+        # so these are (re)created by _bind_loop() for the loop in use
+        self._session = None
+        self._session_loop = None
+        self._global_sem = None
+        self._host_sems = LRUCache(maxsize=MAX_TRACKED_DOMAINS)
+        self._playwright_available = WebCrawler._PLAYWRIGHT_AVAILABLE
         
-        # List of common user agents to rotate through when browser_emulation is enabled
-        self.user_agents = [
+        # Headless browser reused by Playwright fallbacks on the loop that launched it
+        self._pw = None
+        self._pw_browser = None
+        self._pw_loop = None
+        self._pw_lock = None
+        self._pw_claim_lock = threading.Lock()
+        
+        # Private random generator for header rotation and jitter, so concurrent
+        # crawls don't contend on the random module's shared instance
+        self._rng = random.Random()
+        
+        # Common user agents to rotate through when browser_emulation is enabled
+        self.user_agents = (
             'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/98.0.4758.102 Safari/537.36',
             'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/100.0.4896.75 Safari/537.36',
             'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/15.3 Safari/605.1.15',
             'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Edge/99.0.1150.36 Safari/537.36',
             'Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:98.0) Gecko/20100101 Firefox/98.0'
-        ]
+        )
         
         # Common referrer URLs to use when browser_emulation is enabled
-        self.referrers = [
+        self.referrers = (
             'https://www.google.com/',
             'https://www.google.com/search?q=product+reviews',
             'https://www.bing.com/search?q=product+information',
             'https://search.yahoo.com/search?p=product+details',
             'https://duckduckgo.com/?q=product+specs'
-        ]
+        )
         
         # Default request headers
         self.headers = {
@@ -75,152 +198,334 @@ class WebCrawler:
             "Connection": "keep-alive",
             "Upgrade-Insecure-Requests": "1"
         }
+        
+        # Shared session for the synchronous path, so connections (and their TCP
+        # and TLS handshakes) are reused across requests to the same host.
+        # Transient failures are retried here with exponential backoff; Retry-After
+        # is ignored, since a server may ask for an hour-long wait that would tie
+        # up the calling thread
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=32,
+            pool_maxsize=64,
+            max_retries=Retry(
+                total=3,
+                backoff_factor=1.0,
+                status_forcelist=[429, 500, 502, 503, 504],
+                respect_retry_after_header=False,
+                raise_on_status=False
+            )
+        )
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.session.headers.update(self.headers)
     
-    def _get_robots_parser(self, url):
-        """Get and parse robots.txt for the given URL's domain."""
-        parsed_url = urlparse(url)
-        base_url = f"{parsed_url.scheme}://{parsed_url.netloc}"
+    def _cached_robots_parser(self, base_url):
+        """Get the parsed robots.txt for a domain if it was fetched within robots_ttl, else None."""
+        with self._robots_lock:
+            cached = self.robots_cache.get(base_url)
+        if cached is not None:
+            parser, fetched_at = cached
+            if time.monotonic() - fetched_at < self.robots_ttl:
+                return parser
+        return None
+    
+    def _get_robots_parser(self, base_url):
+        """Get and parse robots.txt for a domain, given as scheme://host."""
+        # Check if we already parsed robots.txt for this domain recently
+        parser = self._cached_robots_parser(base_url)
+        if parser is not None:
+            return parser
         
-        # Check if we already parsed robots.txt for this domain
-        if base_url in self.robots_cache:
-            return self.robots_cache[base_url]
+        # Each domain gets its own parser so its rules don't replace another's
+        parser = robotexclusionrulesparser.RobotExclusionRulesParser()
         
         # Fetch and parse robots.txt
         robots_url = f"{base_url}/robots.txt"
         try:
-            response = requests.get(robots_url, headers=self.headers, timeout=15)
+            response = self.session.get(robots_url, timeout=15)
             if response.status_code == 200:
-                self.robots_parser.parse(response.text)
+                parser.parse(response.text)
             else:
                 # If no robots.txt or error, assume everything is allowed
-                self.robots_parser.parse("")
-                
-            # Cache the parser for this domain
-            self.robots_cache[base_url] = self.robots_parser
-            return self.robots_parser
+                parser.parse("")
             
         except Exception as e:
             logger.warning(f"Error fetching robots.txt for {base_url}: {e}")
             # If error, assume everything is allowed
-            self.robots_parser.parse("")
-            self.robots_cache[base_url] = self.robots_parser
-            return self.robots_parser
+            parser.parse("")
+        
+        # Cache the parser for this domain, including "allow everything" results
+        # for missing or unreachable robots.txt, until the TTL expires
+        with self._robots_lock:
+            self.robots_cache[base_url] = (parser, time.monotonic())
+        return parser
+    
+    def _prefilter(self, url, parsed_url=None):
+        """
+        Run cheap structural checks on a URL before any network access.
+        
+        Args:
+            url (str): The URL to check
+            parsed_url (ParseResult): The URL already split by urlparse, if available
+        
+        Returns:
+            str: The reason the URL is rejected, or None if it passes
+        """
+        if len(url) > MAX_URL_LENGTH:
+            return f"URL longer than {MAX_URL_LENGTH} characters"
+        
+        if parsed_url is None:
+            parsed_url = urlparse(url)
+        if parsed_url.scheme not in ('http', 'https'):
+            return f"Unsupported URL scheme: {parsed_url.scheme or 'none'}"
+        if not parsed_url.netloc:
+            return "URL has no host"
+        
+        extension = os.path.splitext(parsed_url.path)[1].lower()
+        if extension in NON_HTML_EXTENSIONS:
+            return f"Non-HTML file extension: {extension}"
+        
+        return None
     
-    def _is_crawlable(self, url):
+    def _is_crawlable(self, url, parsed_url=None, respect_robots=None):
         """Check if the URL is allowed to be crawled according to robots.txt."""
-        if not self.respect_robots:
+        if respect_robots is None:
+            respect_robots = self.respect_robots
+        if not respect_robots:
             return True
-            
-        parser = self._get_robots_parser(url)
+        
+        if parsed_url is None:
+            parsed_url = urlparse(url)
+        parser = self._get_robots_parser(f"{parsed_url.scheme}://{parsed_url.netloc}")
         return parser.is_allowed(self.user_agent, url)
     
-    def _respect_crawl_delay(self, url):
+    def _robots_ready(self, parsed_url, respect_robots=None):
+        """Check whether _is_crawlable can answer for a URL without fetching robots.txt."""
+        if respect_robots is None:
+            respect_robots = self.respect_robots
+        if not respect_robots:
+            return True
+        return self._cached_robots_parser(f"{parsed_url.scheme}://{parsed_url.netloc}") is not None
+    
+    def _domain_delay(self):
+        """Get the delay before the next request to a domain, with jitter if enabled."""
+        if self.jitter:
+            # Irregular spacing looks less like a bot than a fixed interval
+            return self.delay + self._rng.uniform(-0.2, 0.4)
+        return self.delay
+    
+    def _claim_crawl_slot(self, domain):
+        """
+        Schedule the next request to a domain and get how long to wait for it.
+        
+        The slot is recorded before the caller sleeps, so concurrent crawls of the
+        same domain, in threads or tasks, queue up one delay apart instead of
+        racing on the previous timestamp.
+        
+        Returns:
+            float: Seconds to wait before sending the request
+        """
+        with self._domain_lock:
+            # The monotonic clock can't jump backwards when the system time is adjusted
+            now = time.monotonic()
+            sleep_time = 0.0
+            last_time = self.domain_last_accessed.get(domain)
+            if last_time is not None:
+                sleep_time = max(0.0, self._domain_delay() - (now - last_time))
+            self.domain_last_accessed[domain] = now + sleep_time
+        return sleep_time
+    
+    def _respect_crawl_delay(self, domain):
         """Respect the crawl delay for a specific domain."""
-        domain = urlparse(url).netloc
+        sleep_time = self._claim_crawl_slot(domain)
+        if sleep_time > 0:
+            time.sleep(sleep_time)
+    
+    def _build_headers(self, domain):
+        """Build the request headers for a URL on a domain, emulating a browser if enabled."""
+        # Clone the headers and customize for this request
+        current_headers = self.headers.copy()
         
-        # Check if we've accessed this domain before
-        if domain in self.domain_last_accessed:
-            last_time = self.domain_last_accessed[domain]
-            sleep_time = self.delay - (time.time() - last_time)
+        # Set headers to emulate a browser if enabled
+        if self.browser_emulation:
+            # Rotate user agents
+            current_headers['User-Agent'] = self._rng.choice(self.user_agents)
             
-            # If we need to wait, do so
-            if sleep_time > 0:
-                time.sleep(sleep_time)
+            # Use a random referrer with a search query related to the domain
+            base_referrer = self._rng.choice(self.referrers)
+            keywords = domain.split('.')
+            if len(keywords) > 1 and keywords[0] not in ('www', 'blog'):
+                search_term = keywords[0]
+                current_headers['Referer'] = f"{base_referrer}{search_term}"
+            else:
+                current_headers['Referer'] = base_referrer
+            
+            # Add common browser cookies for consent etc.
+            current_headers['Cookie'] = 'consent=true; notice_behavior=implied,us'
+            
+            # Add cache control headers to simulate fresh browser request
+            current_headers['Cache-Control'] = 'max-age=0'
+            current_headers['Sec-Ch-Ua'] = '"Chromium";v="112", "Google Chrome";v="112"'
         
-        # Update the last access time
-        self.domain_last_accessed[domain] = time.time()
+        return current_headers
+    
+    def _add_validators(self, url, headers):
+        """
+        Make the request conditional if the URL's page is in the HTTP cache.
+        
+        Returns:
+            dict: The cached result to reuse on a 304 response, or None
+        """
+        with self._http_cache_lock:
+            cached = self.http_cache.get(url)
+        if cached is None:
+            return None
+        
+        etag, last_modified, result = cached
+        if etag:
+            headers['If-None-Match'] = etag
+        if last_modified:
+            headers['If-Modified-Since'] = last_modified
+        return result
+    
+    def _cache_result(self, url, response_headers, result):
+        """
+        Store a crawl result in the HTTP cache if the server sent validators for it.
+        
+        A copy is stored, since callers may modify the result they are given
+        (e.g. drop its html_content) before the page is revalidated. Pages over
+        MAX_CACHED_PAGE_SIZE, or too big for the cache, are not stored.
+        """
+        etag = response_headers.get('ETag')
+        last_modified = response_headers.get('Last-Modified')
+        size = len(result['html_content'])
+        if (etag or last_modified) and size <= min(MAX_CACHED_PAGE_SIZE, self.http_cache.maxsize):
+            with self._http_cache_lock:
+                self.http_cache[url] = (etag, last_modified, dict(result))
     
-    def crawl(self, url):
+    def _check_response(self, url, status, headers, cached_result):
+        """
+        Check a response's status and headers before its body is read.
+        
+        Args:
+            url (str): The URL that was requested
+            status (int): The HTTP status code
+            headers: The case-insensitive response headers
+            cached_result (dict): The cached result sent as a conditional request, or None
+        
+        Returns:
+            dict: The result to return without reading the body, or None to read it
+        """
+        # The page hasn't changed since it was cached
+        if status == 304 and cached_result is not None:
+            logger.info(f"Not modified, using cached copy of {url}")
+            return dict(cached_result, timestamp=time.time())
+        
+        # Check if request was successful
+        if status != 200:
+            return {
+                "error": f"HTTP error: {status}",
+                "url": url,
+                "response_headers": _select_headers(headers)
+            }
+        
+        # Get content type from headers
+        content_type = headers.get('Content-Type', '').lower()
+        
+        # Only process HTML content; the headers arrive before the body,
+        # so non-HTML and oversized responses are dropped unread
+        if HTML_CONTENT_TYPE not in content_type:
+            return {
+                "error": f"Not HTML content: {content_type}",
+                "url": url
+            }
+        
+        content_length = headers.get('Content-Length', '')
+        if content_length.isdigit() and int(content_length) > self.max_bytes:
+            return {
+                "error": f"Content too large: {content_length} bytes",
+                "url": url
+            }
+        
+        return None
+    
+    def _build_result(self, url, status, headers, body):
+        """Decode a page's body into the crawl result and cache it for revalidation."""
+        content_type = headers.get('Content-Type', '').lower()
+        
+        # Return the raw content and metadata; the body is decoded with the
+        # declared charset instead of guessing one from the bytes
+        result = {
+            "url": url,
+            "status_code": status,
+            "content_type": content_type,
+            "html_content": _decode_body(body, content_type),
+            "headers": _select_headers(headers),
+            "timestamp": time.time()
+        }
+        self._cache_result(url, headers, result)
+        
+        return result
+    
+    def crawl(self, url, respect_robots=None):
         """
         Crawl a URL and extract its content.
         
         Args:
             url (str): The URL to crawl
+            respect_robots (bool): Whether to respect robots.txt for this URL; defaults
+                to the crawler's setting, which is left unchanged
             
         Returns:
             dict: A dictionary containing the raw HTML and other metadata
         """
+        # Split the URL once; the checks below all work on its parts
+        parsed_url = urlparse(url)
+        domain = parsed_url.netloc
+        
+        # Reject obviously uncrawlable URLs first, so we don't spend a robots.txt
+        # round trip on a URL that would be thrown away anyway
+        rejection = self._prefilter(url, parsed_url)
+        if rejection:
+            logger.warning(f"URL {url} rejected: {rejection}")
+            return {"error": f"URL rejected: {rejection}", "url": url}
+        
         # Check if URL is allowed to be crawled
-        if not self._is_crawlable(url):
+        if not self._is_crawlable(url, parsed_url, respect_robots):
             logger.warning(f"URL {url} is disallowed by robots.txt")
-            return {"error": "URL disallowed by robots.txt"}
+            return {"error": "URL disallowed by robots.txt", "url": url}
         
         # Respect crawl delay
-        self._respect_crawl_delay(url)
+        self._respect_crawl_delay(domain)
         
         try:
-            # Add jitter to requests to avoid detection
-            jitter_delay = random.uniform(0.5, 2.5)
-            time.sleep(jitter_delay)
-            
-            # Create a session to manage cookies and add retry mechanism
-            session = requests.Session()
-            
-            # Clone the headers and customize for this request
-            current_headers = self.headers.copy()
+            current_headers = self._build_headers(domain)
+            cached_result = self._add_validators(url, current_headers)
             
-            # Set headers to emulate a browser if enabled
-            if self.browser_emulation:
-                parsed_url = urlparse(url)
-                domain = parsed_url.netloc
-                
-                # Rotate user agents
-                current_headers['User-Agent'] = random.choice(self.user_agents)
-                
-                # Use a random referrer with a search query related to the domain
-                base_referrer = random.choice(self.referrers)
-                keywords = domain.split('.')
-                if len(keywords) > 1 and keywords[0] not in ['www', 'blog']:
-                    search_term = keywords[0]
-                    current_headers['Referer'] = f"{base_referrer}{search_term}"
-                else:
-                    current_headers['Referer'] = base_referrer
-                
-                # Add common browser cookies for consent etc.
-                current_headers['Cookie'] = 'consent=true; notice_behavior=implied,us'
-                
-                # Add cache control headers to simulate fresh browser request
-                current_headers['Cache-Control'] = 'max-age=0'
-                current_headers['Sec-Ch-Ua'] = '"Chromium";v="112", "Google Chrome";v="112"'
-                
-            # Send the request with session
+            # Send the request with the shared session, streaming the body so
+            # it can be cut off at max_bytes
             logger.info(f"Crawling URL: {url}")
-            response = session.get(
+            with self.session.get(
                 url, 
                 headers=current_headers, 
                 timeout=30,
-                allow_redirects=True
-            )
-            
-            # Check if request was successful
-            if response.status_code != 200:
-                return {
-                    "error": f"HTTP error: {response.status_code}",
-                    "url": url,
-                    "response_headers": dict(response.headers)
-                }
+                allow_redirects=True,
+                stream=True
+            ) as response:
+                early_result = self._check_response(url, response.status_code, response.headers, cached_result)
+                if early_result is not None:
+                    return early_result
                 
-            # Get content type from headers
-            content_type = response.headers.get('Content-Type', '').lower()
-            
-            # Only process HTML content
-            if 'text/html' not in content_type:
-                return {
-                    "error": f"Not HTML content: {content_type}",
-                    "url": url
-                }
+                body = bytearray()
+                for chunk in response.iter_content(chunk_size=64 * 1024):
+                    body += chunk
+                    if len(body) >= self.max_bytes:
+                        logger.info(f"Truncating {url} at {self.max_bytes} bytes")
+                        del body[self.max_bytes:]
+                        break
                 
-            # Return the raw content and metadata
-            result = {
-                "url": url,
-                "status_code": response.status_code,
-                "content_type": content_type,
-                "html_content": response.text,
-                "headers": dict(response.headers),
-                "timestamp": time.time()
-            }
-            
-            return result
+                return self._build_result(url, response.status_code, response.headers, body)
             
         except requests.exceptions.RequestException as e:
             logger.error(f"Request error for {url}: {e}")
@@ -377,68 +682,368 @@ class WebCrawler:
                 "url": url
             }
 
-    def _check_module_available(self, module_name):
-        """Check if a Python module is available to import"""
+    async def _arespect_crawl_delay(self, domain):
+        """Respect the crawl delay for a specific domain without blocking the event loop."""
+        sleep_time = self._claim_crawl_slot(domain)
+        if sleep_time > 0:
+            await asyncio.sleep(sleep_time)
+    
+    def _bind_loop(self):
+        """
+        Set up the shared aiohttp session and concurrency limits for the running loop.
+        
+        These are tied to the event loop they were created on, so they are made
+        again if the crawler is used from a different loop.
+        """
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._session_loop is not loop:
+            self._release_session()
+            self._session = aiohttp.ClientSession(
+                connector=self._make_connector(),
+                timeout=aiohttp.ClientTimeout(total=30)
+            )
+            self._session_loop = loop
+            self._global_sem = asyncio.BoundedSemaphore(self.max_concurrency)
+            self._host_sems = LRUCache(maxsize=MAX_TRACKED_DOMAINS)
+        return self._session
+    
+    def _release_session(self):
+        """
+        Close the aiohttp session before it is replaced by one for another event loop.
+        
+        The session belongs to the loop it was created on. If that loop is still
+        running, in another thread, the session is closed there. Otherwise the close
+        coroutine is stepped as far as it gets without a loop, which drops the
+        connector's pooled connections and marks the session closed.
+        """
+        session = self._session
+        if session is None or session.closed:
+            return
+        
+        loop = self._session_loop
+        if loop is not None and loop.is_running():
+            asyncio.run_coroutine_threadsafe(session.close(), loop)
+            return
+        
+        closing = session.close()
         try:
-            importlib.import_module(module_name)
-            return True
-        except ImportError:
-            return False
+            closing.send(None)
+        except StopIteration:
+            return
+        # What's left (e.g. shutting down the resolver) needs the old loop to run
+        closing.close()
+        logger.debug("Closed the aiohttp session of a finished event loop without its loop")
+    
+    def _make_connector(self):
+        """
+        Build the TCP connector for the async session.
+        
+        DNS answers are cached for five minutes, and resolved with aiodns when it
+        is installed instead of getaddrinfo on the default thread pool. Sockets per
+        host are capped at per_host_limit, matching the per-host semaphores.
+        """
+        resolver = AsyncResolver() if importlib.util.find_spec('aiodns') else None
+        return aiohttp.TCPConnector(
+            resolver=resolver,
+            use_dns_cache=True,
+            ttl_dns_cache=300,
+            limit=max(100, self.max_concurrency),
+            limit_per_host=self.per_host_limit,
+            keepalive_timeout=30
+        )
+    
+    def _host_semaphore(self, host):
+        """Get the semaphore limiting concurrent requests to a host."""
+        sem = self._host_sems.get(host)
+        if sem is None:
+            sem = self._host_sems[host] = asyncio.Semaphore(self.per_host_limit)
+        return sem
+    
+    async def acrawl(self, url, respect_robots=None):
+        """
+        Asynchronously crawl a URL and extract its content.
+        
+        Uses a shared aiohttp session so many URLs can be fetched concurrently
+        from a single thread, reusing connections between requests.
+        
+        Args:
+            url (str): The URL to crawl
+            respect_robots (bool): Whether to respect robots.txt for this URL; defaults
+                to the crawler's setting, which is left unchanged
+            
+        Returns:
+            dict: A dictionary containing the raw HTML and other metadata
+        """
+        parsed_url = urlparse(url)
+        domain = parsed_url.netloc
+        
+        # Reject obviously uncrawlable URLs before any network access
+        rejection = self._prefilter(url, parsed_url)
+        if rejection:
+            logger.warning(f"URL {url} rejected: {rejection}")
+            return {"error": f"URL rejected: {rejection}", "url": url}
+        
+        session = self._bind_loop()
+        
+        # Check if URL is allowed to be crawled; robots.txt is fetched synchronously,
+        # so only go through a worker thread when the domain's rules aren't cached
+        if self._robots_ready(parsed_url, respect_robots):
+            allowed = self._is_crawlable(url, parsed_url, respect_robots)
+        else:
+            allowed = await asyncio.to_thread(self._is_crawlable, url, parsed_url, respect_robots)
+        if not allowed:
+            logger.warning(f"URL {url} is disallowed by robots.txt")
+            return {"error": "URL disallowed by robots.txt", "url": url}
+        
+        # Respect crawl delay
+        await self._arespect_crawl_delay(domain)
+        
+        try:
+            current_headers = self._build_headers(domain)
+            cached_result = self._add_validators(url, current_headers)
+            
+            logger.info(f"Crawling URL: {url}")
+            async with self._global_sem, self._host_semaphore(domain), \
+                    session.get(url, headers=current_headers, allow_redirects=True) as response:
+                early_result = self._check_response(url, response.status, response.headers, cached_result)
+                if early_result is not None:
+                    return early_result
+                
+                body = bytearray()
+                async for chunk in response.content.iter_chunked(64 * 1024):
+                    body += chunk
+                    if len(body) >= self.max_bytes:
+                        logger.info(f"Truncating {url} at {self.max_bytes} bytes")
+                        del body[self.max_bytes:]
+                        break
+                
+                return self._build_result(url, response.status, response.headers, body)
+                
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            error = str(e) or e.__class__.__name__
+            logger.error(f"Request error for {url}: {error}")
+            
+            # Try the headless browser fallback if enabled and available
+            if self.use_fallback:
+                if self._playwright_available:
+                    logger.info(f"Trying fallback methods for {url}")
+                    return await self._fallback_playwright(url)
+                logger.warning("No fallback browser libraries available")
+            
+            return {
+                "error": error,
+                "url": url
+            }
+    
+    async def crawl_many(self, urls):
+        """
+        Crawl several URLs concurrently.
+        
+        Args:
+            urls (list): The URLs to crawl
+            
+        Returns:
+            list: The crawl result for each URL, in the same order
+        """
+        return await asyncio.gather(*(self.acrawl(url) for url in urls))
+    
+    async def crawl_queue(self, urls, workers=32):
+        """
+        Crawl URLs through a fixed pool of worker tasks, yielding results as they finish.
+        
+        Unlike crawl_many, URLs are pulled from the iterable only as workers free up,
+        so a very large or lazily generated URL list never becomes one task per URL.
+        
+        Args:
+            urls (iterable): The URLs to crawl
+            workers (int): Number of concurrent worker tasks
+            
+        Yields:
+            tuple: (url, result) for each URL, in completion order
+        """
+        url_queue = asyncio.Queue(maxsize=workers * 4)
+        result_queue = asyncio.Queue(maxsize=workers * 4)
+        
+        async def produce():
+            error = None
+            try:
+                for url in urls:
+                    await url_queue.put(url)
+            except Exception as e:
+                error = e
+            # One stop marker per worker, so they all exit once the URLs run out
+            for _ in range(workers):
+                await url_queue.put(None)
+            if error is not None:
+                raise error
+        
+        async def work():
+            while True:
+                url = await url_queue.get()
+                if url is None:
+                    break
+                try:
+                    result = await self.acrawl(url)
+                except Exception as e:
+                    logger.error(f"Unexpected error crawling {url}: {e}")
+                    result = {"error": str(e), "url": url}
+                await result_queue.put((url, result))
+            await result_queue.put(None)
+        
+        producer = asyncio.create_task(produce())
+        tasks = [asyncio.create_task(work()) for _ in range(workers)]
+        try:
+            finished = 0
+            while finished < workers:
+                item = await result_queue.get()
+                if item is None:
+                    finished += 1
+                else:
+                    yield item
+            # Surface errors raised while iterating over urls
+            await producer
+        finally:
+            producer.cancel()
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(producer, *tasks, return_exceptions=True)
+    
+    async def aclose(self):
+        """Close the shared aiohttp session and the fallback browser, if this loop owns it."""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+        self._session_loop = None
+        
+        if self._pw_loop is asyncio.get_running_loop():
+            await self._close_browser()
+    
+    async def __aenter__(self):
+        return self
+    
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.aclose()
+
+    def close(self):
+        """Close the shared HTTP session used by the synchronous crawl path."""
+        self.session.close()
+        
+        # The sync fallback drives its own loop; close the browser on it if idle
+        loop = self._pw_loop
+        if loop is not None and not loop.is_closed() and not loop.is_running():
+            loop.run_until_complete(self._close_browser())
+    
+    async def _shared_browser(self):
+        """
+        Get the headless browser reused across fallback calls, launching it on first use.
+        
+        Playwright objects belong to the event loop that started them, so the browser
+        is only shared by calls on that loop.
+        
+        Returns:
+            The Playwright browser, or None when called from a different event loop
+        """
+        loop = asyncio.get_running_loop()
+        with self._pw_claim_lock:
+            if self._pw_loop is None or self._pw_loop.is_closed():
+                self._pw = None
+                self._pw_browser = None
+                self._pw_loop = loop
+                self._pw_lock = asyncio.Lock()
+            elif self._pw_loop is not loop:
+                return None
+        
+        async with self._pw_lock:
+            if self._pw_browser is None or not self._pw_browser.is_connected():
+                from playwright.async_api import async_playwright
+                
+                if self._pw is None:
+                    self._pw = await async_playwright().start()
+                self._pw_browser = await self._pw.chromium.launch(headless=True)
+        return self._pw_browser
+    
+    async def _close_browser(self):
+        """Close the shared fallback browser and stop Playwright."""
+        try:
+            if self._pw_browser is not None:
+                await self._pw_browser.close()
+            if self._pw is not None:
+                await self._pw.stop()
+        except Exception as e:
+            logger.warning(f"Error closing Playwright browser: {e}")
+        self._pw = None
+        self._pw_browser = None
+        self._pw_loop = None
+        self._pw_lock = None
     
     async def _fallback_playwright(self, url):
         """Use Playwright as a fallback method to fetch content from anti-bot sites"""
+        playwright = None
+        browser = None
+        context = None
         try:
-            # Import Playwright modules
-            from playwright.async_api import async_playwright
-            
             logger.info(f"Using Playwright async API to fetch {url}")
             
-            playwright = await async_playwright().start()
-            browser = await playwright.chromium.launch(headless=True)
+            browser = await self._shared_browser()
+            if browser is None:
+                # Another event loop owns the shared browser; use a one-off instance
+                from playwright.async_api import async_playwright
+                
+                playwright = await async_playwright().start()
+                browser = await playwright.chromium.launch(headless=True)
             
-            # Create a context with stealth options
+            # Create a context with stealth options; each fetch gets its own, so
+            # cookies and storage don't carry over between pages
             context = await browser.new_context(
-                user_agent=random.choice(self.user_agents) if self.browser_emulation else self.user_agent,
+                user_agent=self._rng.choice(self.user_agents) if self.browser_emulation else self.user_agent,
                 viewport={'width': 1920, 'height': 1080},
                 device_scale_factor=1
             )
             
             # Add some randomization to appear more human-like
             page = await context.new_page()
+            await page.route("**/*", _block_heavy_resources)
             await page.goto("https://www.google.com")
-            await page.wait_for_timeout(random.randint(500, 1500))
+            await page.wait_for_timeout(self._rng.randint(500, 1500))
             
             # Go to the actual target URL
-            response = await page.goto(url, timeout=30000)
+            response = await page.goto(url, timeout=30000, wait_until="domcontentloaded")
             
             if response.status != 200:
-                await browser.close()
-                await playwright.stop()
                 return {
                     "error": f"HTTP error: {response.status}",
                     "url": url
                 }
             
-            # Wait for content to fully load
-            await page.wait_for_load_state("networkidle")
+            # Give scripts a moment to render; waiting for network idle can stall
+            # for the full timeout on pages with long-polling trackers
+            await page.wait_for_timeout(500)
             
             # Extract content
             html_content = await page.content()
-            await browser.close()
-            await playwright.stop()
             
             return {
                 "url": url,
                 "status_code": 200,
-                "content_type": "text/html",
+                "content_type": HTML_CONTENT_TYPE,
                 "html_content": html_content,
-                "headers": {"Content-Type": "text/html"},
+                "headers": {"Content-Type": HTML_CONTENT_TYPE},
                 "timestamp": time.time()
             }
                 
         except Exception as e:
             logger.error(f"Playwright fallback failed for {url}: {e}")
             return {"error": f"Playwright fallback failed: {str(e)}", "url": url}
+        finally:
+            try:
+                if context is not None:
+                    await context.close()
+                if playwright is not None:
+                    if browser is not None:
+                        await browser.close()
+                    await playwright.stop()
+            except Exception as e:
+                logger.warning(f"Error cleaning up Playwright for {url}: {e}")
     
 
 # For testing
@@ -0,0 +1,45 @@
+"""Shared pytest configuration for the test suite."""
+import os
+import sys
+
+import pytest
+import pytest_asyncio
+
+# Add parent directory to path to import modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from crawler.crawler import WebCrawler
+
+def pytest_addoption(parser):
+    """Add the --run-network option for tests that need internet access."""
+    parser.addoption(
+        "--run-network", action="store_true", default=False,
+        help="run tests marked network, which reach live sites"
+    )
+
+def pytest_configure(config):
+    """Register the network marker."""
+    config.addinivalue_line("markers", "network: test reaches live sites; skipped unless --run-network is given")
+
+def pytest_collection_modifyitems(config, items):
+    """Skip network tests unless --run-network is given."""
+    if config.getoption("--run-network"):
+        return
+    skip_network = pytest.mark.skip(reason="needs network access; pass --run-network to run")
+    for item in items:
+        if "network" in item.keywords:
+            item.add_marker(skip_network)
+
+@pytest.fixture(autouse=True)
+def clear_robots_cache():
+    """Start every test with no robots.txt rules cached, since the cache is shared process-wide."""
+    with WebCrawler._robots_lock:
+        WebCrawler._robots_cache.clear()
+    yield
+
+@pytest_asyncio.fixture(scope="session", loop_scope="session")
+async def crawler():
+    """A WebCrawler shared by the whole test session, so its connection pools are reused."""
+    async with WebCrawler() as shared_crawler:
+        yield shared_crawler
+    shared_crawler.close()
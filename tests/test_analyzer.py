@@ -1,15 +1,12 @@
 """Test the analyzer components."""
-import os
-import sys
-
-# Add parent directory to path to import modules
-sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import pytest
 
 from analyzer.metadata_extractor import MetadataExtractor
+from analyzer.classifier import ContentClassifier
+
+_EXTRACTOR = MetadataExtractor()
 
-def test_metadata_extraction_basic_html():
-    """Test basic metadata extraction from HTML."""
-    html_content = """
+_BASIC_HTML = """
     <!DOCTYPE html>
     <html>
     <head>
@@ -27,10 +24,29 @@ def test_metadata_extraction_basic_html():
     </body>
     </html>
     """
-    
-    extractor = MetadataExtractor()
-    metadata = extractor.extract_metadata(html_content, "https://example.com/test-page")
-    
+
+_EMPTY_HTML = "<html><head></head><body></body></html>"
+
+_MALFORMED_HTML = """<html><head><title>Broken Page</title></
+    <body><h1>Heading
+    <p>Paragraph without closing tag
+    <a href=no-quotes>Bad link</a>
+    </html>
+    """
+
+_STRUCTURED_DATA_HTML = """
+    <html>
+    <head>
+        <script type="application/ld+json">{"@type": "Product", "name": "Toaster"}</script>
+        <script type="application/ld+json">not json</script>
+        <script type="application/ld+json"></script>
+    </head>
+    <body><p>Product page</p></body>
+    </html>
+    """
+
+def check_basic_html(metadata):
+    """Check metadata extracted from a small well-formed page."""
     assert metadata is not None
     assert metadata["title"] == "Test Page"
     assert metadata["description"] == "Test description"
@@ -39,17 +55,14 @@ def test_metadata_extraction_basic_html():
     assert metadata["headings"]["h1"][0] == "Main Heading"
     
     # Test links
-    assert len(metadata["links"]) == 2
-    assert any(link["href"] == "https://example.com/link1" for link in metadata["links"])
-    assert any(link["href"] == "https://external.com/link2" for link in metadata["links"])
+    links = sorted((link["href"], link.get("text", "")) for link in metadata["links"])
+    assert links == [
+        ("https://example.com/link1", "Link 1"),
+        ("https://external.com/link2", "Link 2"),
+    ]
 
-def test_metadata_extraction_empty_html():
-    """Test metadata extraction from empty HTML."""
-    html_content = "<html><head></head><body></body></html>"
-    
-    extractor = MetadataExtractor()
-    metadata = extractor.extract_metadata(html_content, "https://example.com/empty")
-    
+def check_empty_html(metadata):
+    """Check metadata extracted from a page with no content."""
     assert metadata is not None
     assert metadata["title"] is None or metadata["title"] == ""
     assert metadata["description"] is None or metadata["description"] == ""
@@ -59,18 +72,8 @@ def test_metadata_extraction_empty_html():
     assert "links" in metadata
     assert len(metadata["links"]) == 0
 
-def test_metadata_extraction_with_malformed_html():
-    """Test metadata extraction from malformed HTML."""
-    html_content = """<html><head><title>Broken Page</title></
-    <body><h1>Heading
-    <p>Paragraph without closing tag
-    <a href=no-quotes>Bad link</a>
-    </html>
-    """
-    
-    extractor = MetadataExtractor()
-    metadata = extractor.extract_metadata(html_content, "https://example.com/broken")
-    
+def check_malformed_html(metadata):
+    """Check metadata extracted from a page with broken markup."""
     # Even with malformed HTML, we should get a result
     assert metadata is not None
     assert metadata["title"] == "Broken Page"
@@ -79,7 +82,43 @@ def test_metadata_extraction_with_malformed_html():
     assert len(metadata["headings"]["h1"]) > 0
     assert "Bad link" in [link.get("text", "") for link in metadata["links"]]
 
+_EXTRACTION_CASES = [
+    pytest.param(_BASIC_HTML, "https://example.com/test-page", check_basic_html, id="basic"),
+    # Raw response bytes are parsed directly, without decoding to str first
+    pytest.param(_BASIC_HTML.encode("utf-8"), "https://example.com/test-page", check_basic_html, id="basic-bytes"),
+    pytest.param(_EMPTY_HTML, "https://example.com/empty", check_empty_html, id="empty"),
+    pytest.param(_MALFORMED_HTML, "https://example.com/broken", check_malformed_html, id="malformed"),
+]
+
+@pytest.mark.parametrize("html_content, url, check", _EXTRACTION_CASES)
+def test_metadata_extraction(html_content, url, check):
+    """Test metadata extraction from basic, empty and malformed HTML."""
+    metadata = _EXTRACTOR.extract_metadata(html_content, url)
+    check(metadata)
+
+def test_structured_data_extraction():
+    """Test that valid JSON-LD blocks are parsed and invalid or empty ones skipped."""
+    metadata = _EXTRACTOR.extract_metadata(_STRUCTURED_DATA_HTML, "https://example.com/product")
+    
+    assert metadata["structured_data"] == [{"@type": "Product", "name": "Toaster"}]
+
+def test_topics_ranked_by_tfidf_after_fit():
+    """Test that a fitted IDF table ranks page-specific words above corpus-wide ones."""
+    corpus = [
+        "shipping price product toaster",
+        "shipping price product blender",
+        "shipping price product kettle",
+    ]
+    
+    classifier = ContentClassifier().fit_idf(corpus)
+    tokens = classifier._tokenize("shipping shipping price product toaster toaster")
+    
+    assert classifier._extract_topics(tokens)[0] == "toaster"
+    # Without an IDF table, raw frequency ties are broken by first occurrence
+    assert ContentClassifier()._extract_topics(tokens)[0] == "shipping"
+
 if __name__ == "__main__":
-    test_metadata_extraction_basic_html()
-    test_metadata_extraction_empty_html()
-    test_metadata_extraction_with_malformed_html()
+    for case in _EXTRACTION_CASES:
+        test_metadata_extraction(*case.values)
+    test_structured_data_extraction()
+    test_topics_ranked_by_tfidf_after_fit()
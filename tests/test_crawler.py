@@ -1,14 +1,21 @@
 """Test the web crawler functionality."""
 import asyncio
-import os
-import sys
+from concurrent.futures import ThreadPoolExecutor
 import pytest
-
-# Add parent directory to path to import modules
-sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import requests
+import responses
+from aiohttp import web
+from aiohttp.test_utils import TestServer, unused_port
 
 from crawler.crawler import WebCrawler
 
+EXAMPLE_PAGE = """<!doctype html>
+<html>
+<head><title>Example Domain</title></head>
+<body><h1>Example Domain</h1><p>This domain is for use in illustrative examples in documents.</p></body>
+</html>
+"""
+
 def test_crawler_initialization():
     """Test that the crawler initializes with correct default parameters"""
     crawler = WebCrawler()
@@ -24,50 +31,269 @@ def test_crawler_initialization():
     assert custom_crawler.browser_emulation == False
     assert custom_crawler.use_fallback == False
 
-def test_crawl_example_site():
-    """Test crawling a simple example site"""
-    crawler = WebCrawler()
-    result = crawler.crawl("https://example.com")
-    
+def check_example_site(result):
+    """Check the crawl result for https://example.com"""
     assert result is not None
     assert "status_code" in result
     assert result["status_code"] == 200
     assert "html_content" in result
     assert "Example Domain" in result["html_content"]
 
-def test_nonexistent_site():
-    """Test crawling a non-existent site"""
-    crawler = WebCrawler()
-    result = crawler.crawl("https://thissitedoesnotexist12345.com")
-    
+def check_nonexistent_site(result):
+    """Check the crawl result for a host that doesn't resolve"""
     assert "error" in result
     # The error could be from regular request or from Playwright fallback
-    assert "Playwright fallback failed" in result["error"] or "Request error" in result["error"] or "Failed to establish" in result["error"]
+    assert ("Playwright fallback failed" in result["error"] or "Request error" in result["error"]
+            or "Failed to establish" in result["error"] or "Cannot connect to host" in result["error"])
 
-def test_robots_txt_compliance():
-    """Test that the crawler respects robots.txt"""
-    # Create a crawler that respects robots.txt
-    crawler_respectful = WebCrawler(respect_robots=True)
+def check_robots_disallowed(result):
+    """Check the crawl result for a URL disallowed by robots.txt"""
+    assert "error" in result
+    assert "disallowed by robots.txt" in result["error"]
+
+def make_example_app():
+    """An aiohttp app standing in for https://example.com, robots.txt included"""
+    async def page(request):
+        return web.Response(text=EXAMPLE_PAGE, content_type="text/html")
     
-    # Create a crawler that ignores robots.txt
-    crawler_disrespectful = WebCrawler(respect_robots=False)
+    async def robots(request):
+        return web.Response(text="User-agent: *\nDisallow:")
+    
+    app = web.Application()
+    app.router.add_get("/", page)
+    app.router.add_get("/robots.txt", robots)
+    return app
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_crawl_example_site(crawler):
+    """Test crawling a simple example site, served locally"""
+    async with TestServer(make_example_app()) as server:
+        result = await crawler.acrawl(str(server.make_url("/")))
     
+    check_example_site(result)
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_nonexistent_site():
+    """Test crawling a site that can't be reached, on a local port nothing listens on"""
+    url = f"http://127.0.0.1:{unused_port()}"
+    # Without the browser fallback, which would try to load the page again; robots.txt
+    # is mocked, since the session would otherwise retry the refused connection
+    async with WebCrawler(use_fallback=False) as crawler:
+        with responses.RequestsMock() as mocked_requests:
+            mocked_requests.add(
+                responses.GET, f"{url}/robots.txt",
+                body=requests.exceptions.ConnectionError("Failed to establish a new connection")
+            )
+            result = await crawler.acrawl(url)
+    
+    check_nonexistent_site(result)
+
+@pytest.mark.network
+@pytest.mark.asyncio(loop_scope="session")
+async def test_robots_txt_compliance(crawler):
+    """Test that the crawler respects robots.txt"""
     # Choose a URL that's commonly disallowed in robots.txt
     test_url = "https://www.google.com/search"
     
+    # The shared crawler respects robots.txt; compare with one that ignores it
+    assert crawler.respect_robots
+    async with WebCrawler(respect_robots=False) as crawler_disrespectful:
+        respectful_result, disrespectful_result = await asyncio.gather(
+            crawler.acrawl(test_url),
+            crawler_disrespectful.acrawl(test_url)
+        )
+    
     # Test the respectful crawler
-    respectful_result = crawler_respectful.crawl(test_url)
-    assert "error" in respectful_result
-    assert "disallowed by robots.txt" in respectful_result["error"]
+    check_robots_disallowed(respectful_result)
     
     # Test the disrespectful crawler
-    disrespectful_result = crawler_disrespectful.crawl(test_url)
     # May still fail for other reasons but not robots.txt
     if "error" in disrespectful_result:
         assert "disallowed by robots.txt" not in disrespectful_result["error"]
 
+@pytest.mark.network
+@pytest.mark.asyncio(loop_scope="session")
+async def test_network_batch(crawler):
+    """Test that the network checks hold when the URLs are crawled concurrently"""
+    example, nonexistent, disallowed = await crawler.crawl_many([
+        "https://example.com",
+        "https://thissitedoesnotexist12345.com",
+        "https://www.google.com/search"
+    ])
+    
+    check_example_site(example)
+    check_nonexistent_site(nonexistent)
+    check_robots_disallowed(disallowed)
+
+def test_prefilter_rejects_before_network(monkeypatch):
+    """Test that structurally uncrawlable URLs are rejected without fetching robots.txt"""
+    fetched = []
+    crawler = WebCrawler()
+    monkeypatch.setattr(crawler.session, "get", lambda url, **kwargs: fetched.append(url))
+    
+    for url in ["ftp://example.com/file", "https://example.com/report.pdf", "https://example.com/" + "a" * 3000]:
+        result = crawler.crawl(url)
+        assert "URL rejected" in result["error"]
+    
+    assert fetched == []
+    assert crawler._prefilter("https://example.com/page.html") is None
+
+def test_robots_rules_cached_per_domain(monkeypatch):
+    """Test that each domain keeps its own robots.txt rules and they are fetched once"""
+    robots_files = {
+        "https://a.example/robots.txt": "User-agent: *\nDisallow: /private",
+        "https://b.example/robots.txt": "User-agent: *\nDisallow:",
+    }
+    fetched = []
+    
+    class FakeResponse:
+        def __init__(self, text):
+            self.status_code = 200
+            self.text = text
+    
+    def fake_get(url, **kwargs):
+        fetched.append(url)
+        return FakeResponse(robots_files[url])
+    
+    crawler = WebCrawler()
+    monkeypatch.setattr(crawler.session, "get", fake_get)
+    
+    assert not crawler._is_crawlable("https://a.example/private/page")
+    assert crawler._is_crawlable("https://b.example/private/page")
+    # Parsing b.example must not have replaced a.example's rules
+    assert not crawler._is_crawlable("https://a.example/private/other")
+    assert sorted(fetched) == sorted(robots_files)
+    
+    # Another crawler reuses the rules instead of fetching robots.txt again
+    other_crawler = WebCrawler()
+    monkeypatch.setattr(other_crawler.session, "get", fake_get)
+    assert not other_crawler._is_crawlable("https://a.example/private/page")
+    assert sorted(fetched) == sorted(robots_files)
+
+def test_crawl_delay_spaces_concurrent_threads():
+    """Test that threads crawling one domain at once are scheduled a delay apart"""
+    crawler = WebCrawler(delay=0.5, browser_emulation=False)
+    
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        waits = sorted(pool.map(lambda _: crawler._claim_crawl_slot("slots.example"), range(4)))
+    
+    assert waits == pytest.approx([0.0, 0.5, 1.0, 1.5], abs=0.05)
+
+@responses.activate
+def test_http_cache_bounded_by_page_size():
+    """Test that the HTTP cache is bounded by the total size of its pages"""
+    page = "<html><body>" + "x" * 36 + "</body></html>"
+    for name in ["a", "b", "c"]:
+        responses.add(
+            responses.GET, f"https://sizes.example/{name}", body=page,
+            content_type="text/html", headers={"ETag": f'"{name}"'}
+        )
+    responses.add(
+        responses.GET, "https://sizes.example/big", body=page * 3,
+        content_type="text/html", headers={"ETag": '"big"'}
+    )
+    
+    crawler = WebCrawler(delay=0, respect_robots=False, browser_emulation=False,
+                         use_fallback=False, http_cache_bytes=2 * len(page))
+    for name in ["a", "b", "c", "big"]:
+        assert "error" not in crawler.crawl(f"https://sizes.example/{name}")
+    
+    # The oldest page was evicted to make room, and the oversized one was never stored
+    assert list(crawler.http_cache) == ["https://sizes.example/b", "https://sizes.example/c"]
+    assert crawler.http_cache.currsize == 2 * len(page)
+
+@responses.activate
+def test_respect_robots_per_call():
+    """Test that robots.txt can be ignored for one call without changing the crawler"""
+    url = "https://robots.example/private/page"
+    responses.add(responses.GET, "https://robots.example/robots.txt", body="User-agent: *\nDisallow: /private")
+    responses.add(responses.GET, url, body=EXAMPLE_PAGE, content_type="text/html")
+    
+    crawler = WebCrawler(delay=0, browser_emulation=False, use_fallback=False)
+    check_robots_disallowed(crawler.crawl(url))
+    assert "Example Domain" in crawler.crawl(url, respect_robots=False)["html_content"]
+    assert crawler.respect_robots
+
+def test_crawl_queue_yields_every_url(monkeypatch):
+    """Test that the worker pool crawls each URL once and yields every result"""
+    urls = [f"https://example.com/page{i}" for i in range(25)]
+    
+    async def fake_acrawl(url):
+        await asyncio.sleep(0)
+        return {"url": url, "status_code": 200}
+    
+    crawler = WebCrawler()
+    monkeypatch.setattr(crawler, "acrawl", fake_acrawl)
+    
+    async def collect():
+        return [item async for item in crawler.crawl_queue(iter(urls), workers=4)]
+    
+    results = asyncio.run(collect())
+    assert sorted(url for url, _ in results) == sorted(urls)
+    assert all(result["url"] == url for url, result in results)
+
+@responses.activate
+def test_crawl_decodes_with_declared_charset():
+    """Test that bodies are decoded with their declared charset, else UTF-8"""
+    pages = {
+        "https://charsets.example/latin1": ("text/html; charset=ISO-8859-1", "café".encode("latin-1")),
+        "https://charsets.example/undeclared": ("text/html", "café".encode("utf-8")),
+        "https://charsets.example/bogus": ("text/html; charset=bogus-cs", "café".encode("utf-8")),
+    }
+    for url, (content_type, body) in pages.items():
+        responses.add(responses.GET, url, body=body, content_type=content_type)
+    
+    crawler = WebCrawler(delay=0, respect_robots=False, browser_emulation=False, use_fallback=False)
+    for url in pages:
+        result = crawler.crawl(url)
+        assert result["html_content"] == "café", url
+
+@responses.activate
+def test_not_modified_returns_cached_page():
+    """Test that a 304 returns the cached page, even if the first result was modified"""
+    url = "https://cached.example/page"
+    responses.add(
+        responses.GET, url, body=EXAMPLE_PAGE, content_type="text/html",
+        headers={"ETag": '"v1"'}
+    )
+    responses.add(responses.GET, url, status=304)
+    
+    crawler = WebCrawler(delay=0, respect_robots=False, browser_emulation=False, use_fallback=False)
+    first = crawler.crawl(url)
+    # As the API does before storing the result
+    del first["html_content"]
+    
+    second = crawler.crawl(url)
+    assert responses.calls[1].request.headers["If-None-Match"] == '"v1"'
+    assert second["status_code"] == 200
+    assert second["html_content"] == EXAMPLE_PAGE
+
+def test_session_closed_when_loop_changes():
+    """Test that the aiohttp session of a finished event loop is closed when it's replaced"""
+    crawler = WebCrawler()
+    
+    async def bind():
+        return crawler._bind_loop()
+    
+    first = asyncio.run(bind())
+    
+    async def rebind():
+        second = crawler._bind_loop()
+        await crawler.aclose()
+        return second
+    
+    second = asyncio.run(rebind())
+    assert second is not first
+    assert first.closed
+
 if __name__ == "__main__":
     test_crawler_initialization()
-    test_crawl_example_site()
-    test_nonexistent_site()
-    test_robots_txt_compliance()
+    
+    async def run_network_tests():
+        async with WebCrawler() as crawler:
+            await test_crawl_example_site(crawler)
+            await test_nonexistent_site()
+            await test_robots_txt_compliance(crawler)
+            await test_network_batch(crawler)
+    
+    asyncio.run(run_network_tests())